@@ -17,27 +17,39 @@ cdef list bfs_from_hierarchy(np.ndarray[np.double_t, ndim=2] hierarchy,
     Perform a breadth first search on a tree in scipy hclust format.
     """
 
-    cdef list to_process
+    cdef np.ndarray[np.intp_t, ndim=1] result
     cdef np.intp_t max_node
     cdef np.intp_t num_points
     cdef np.intp_t dim
+    cdef np.intp_t num_found
+    cdef np.intp_t node
+    cdef np.intp_t i
 
     dim = hierarchy.shape[0]
     max_node = 2 * dim
     num_points = max_node - dim + 1
 
-    to_process = [bfs_root]
-    result = []
+    # A subtree containing n points has 2n - 1 nodes; the result array
+    # doubles as the queue of nodes still to be expanded
+    if bfs_root >= num_points:
+        result = np.empty(2 * <np.intp_t> hierarchy[bfs_root - num_points, 3] - 1,
+                          dtype=np.intp)
+    else:
+        result = np.empty(1, dtype=np.intp)
 
-    while to_process:
-        result.extend(to_process)
-        to_process = [x - num_points for x in
-                      to_process if x >= num_points]
-        if to_process:
-            to_process = hierarchy[to_process,
-                                   :2].flatten().astype(np.intp).tolist()
+    result[0] = bfs_root
+    num_found = 1
+    i = 0
 
-    return result
+    while i < num_found:
+        node = result[i]
+        if node >= num_points:
+            result[num_found] = <np.intp_t> hierarchy[node - num_points, 0]
+            result[num_found + 1] = <np.intp_t> hierarchy[node - num_points, 1]
+            num_found += 2
+        i += 1
+
+    return result[:num_found].tolist()
 
 
 cpdef np.ndarray condense_tree(np.ndarray[np.double_t, ndim=2] hierarchy,
@@ -595,12 +607,156 @@ cpdef np.ndarray get_stability_scores(np.ndarray labels, set clusters,
 
     return result
 
+cdef _check_children_index(np.ndarray[np.intp_t, ndim=1] sorted_children,
+                           np.ndarray[np.intp_t, ndim=1] offsets,
+                           np.intp_t root):
+    # Bounds checking is disabled for this module, so validate the index
+    # once up front rather than risk reading outside the arrays
+    cdef np.intp_t num_nodes = offsets.shape[0] - 1
+
+    if not 0 <= root < num_nodes:
+        raise ValueError('Root node %d is not in the children index' % root)
+    # Non-decreasing offsets from 0 to the number of children keep every
+    # node's range of children within sorted_children
+    if offsets[0] != 0 or offsets[num_nodes] != sorted_children.shape[0] or \
+            np.any(np.diff(offsets) < 0):
+        raise ValueError('Children index offsets do not match the children')
+    if sorted_children.shape[0] > 0 and \
+            (sorted_children.min() < 0 or sorted_children.max() >= num_nodes):
+        raise ValueError('Children index refers to nodes outside the index')
+
+
+cpdef list leaves_from_children_index(
+        np.ndarray[np.intp_t, ndim=1] sorted_children,
+        np.ndarray[np.intp_t, ndim=1] offsets,
+        np.intp_t root):
+    """Depth first search for the leaves below ``root`` in a tree whose
+    children have been grouped by parent: the children of node ``n`` are
+    ``sorted_children[offsets[n]:offsets[n + 1]]``. Leaves are returned in
+    left to right order.
+    """
+    cdef list result = []
+    cdef np.ndarray[np.intp_t, ndim=1] to_process
+    cdef np.intp_t num_to_process
+    cdef np.intp_t num_pushed
+    cdef np.intp_t node
+    cdef np.intp_t i
+
+    _check_children_index(sorted_children, offsets, root)
+
+    # Every node is pushed at most once, so the stack can be preallocated
+    to_process = np.empty(sorted_children.shape[0] + 1, dtype=np.intp)
+    to_process[0] = root
+    num_to_process = 1
+    num_pushed = 1
+
+    while num_to_process > 0:
+        num_to_process -= 1
+        node = to_process[num_to_process]
+        if offsets[node] == offsets[node + 1]:
+            result.append(node)
+        else:
+            for i in range(offsets[node + 1] - 1, offsets[node] - 1, -1):
+                if num_pushed == to_process.shape[0]:
+                    raise ValueError('Children index does not describe a tree')
+                to_process[num_to_process] = sorted_children[i]
+                num_to_process += 1
+                num_pushed += 1
+
+    return result
+
+
+cpdef np.ndarray[np.intp_t, ndim=1] bfs_from_children_index(
+        np.ndarray[np.intp_t, ndim=1] sorted_children,
+        np.ndarray[np.intp_t, ndim=1] offsets,
+        np.intp_t bfs_root):
+    """Breadth first search from ``bfs_root`` in a tree whose children have
+    been grouped by parent, as for ``leaves_from_children_index``.
+    """
+    cdef np.ndarray[np.intp_t, ndim=1] result
+    cdef np.intp_t num_found
+    cdef np.intp_t node
+    cdef np.intp_t i
+    cdef np.intp_t j
+
+    _check_children_index(sorted_children, offsets, bfs_root)
+
+    # The result doubles as the queue of nodes still to be expanded
+    result = np.empty(sorted_children.shape[0] + 1, dtype=np.intp)
+    result[0] = bfs_root
+    num_found = 1
+    i = 0
+
+    while i < num_found:
+        node = result[i]
+        for j in range(offsets[node], offsets[node + 1]):
+            if num_found == result.shape[0]:
+                raise ValueError('Children index does not describe a tree')
+            result[num_found] = sorted_children[j]
+            num_found += 1
+        i += 1
+
+    return result[:num_found]
+
+
+cpdef np.ndarray[np.intp_t, ndim=1] icicle_bar_ends(
+        np.ndarray[np.double_t, ndim=1] lambdas,
+        np.ndarray[np.double_t, ndim=1] prev_lambdas,
+        np.ndarray[np.double_t, ndim=1] sizes,
+        np.double_t last_step_size,
+        np.double_t step_size_change,
+        np.double_t max_lambda):
+    """Find the rows at which the bars of a condensed tree icicle plot end.
+
+    The rows are the children of a single cluster ordered by lambda value;
+    ``sizes`` and ``prev_lambdas`` give the size and lambda value of the
+    cluster just before each child leaves it. A bar ends wherever lambda
+    changes and either the cluster has shrunk by more than
+    ``step_size_change`` since the last bar ended, or the maximum lambda
+    value of the cluster has been reached.
+    """
+    cdef np.ndarray[np.intp_t, ndim=1] result
+    cdef np.intp_t num_bars = 0
+    cdef np.intp_t i
+
+    if prev_lambdas.shape[0] != lambdas.shape[0] or \
+            sizes.shape[0] != lambdas.shape[0]:
+        raise ValueError('lambdas, prev_lambdas and sizes must have the '
+                         'same length')
+
+    result = np.empty(lambdas.shape[0], dtype=np.intp)
+
+    for i in range(lambdas.shape[0]):
+        if lambdas[i] != prev_lambdas[i] and \
+                (last_step_size - sizes[i] > step_size_change or
+                 lambdas[i] == max_lambda):
+            result[num_bars] = i
+            num_bars += 1
+            last_step_size = sizes[i]
+
+    return result[:num_bars]
+
+
 cpdef list recurse_leaf_dfs(np.ndarray cluster_tree, np.intp_t current_node):
-    children = cluster_tree[cluster_tree['parent'] == current_node]['child']
-    if len(children) == 0:
-        return [current_node,]
-    else:
-        return sum([recurse_leaf_dfs(cluster_tree, child) for child in children], [])
+    """Find the leaves below ``current_node``, in left to right order.
+
+    The children of the cluster tree are grouped by parent once, and the
+    search itself is done by ``leaves_from_children_index``.
+    """
+    cdef np.ndarray order
+    cdef np.ndarray offsets
+    cdef np.intp_t max_node
+
+    if cluster_tree.shape[0] == 0:
+        return [current_node]
+
+    max_node = max(current_node, cluster_tree['child'].max())
+    order = np.argsort(cluster_tree['parent'], kind='mergesort')
+    offsets = np.searchsorted(cluster_tree['parent'][order],
+                              np.arange(max_node + 2)).astype(np.intp)
+
+    return leaves_from_children_index(
+        cluster_tree['child'][order].astype(np.intp), offsets, current_node)
 
 
 cpdef list get_cluster_tree_leaves(np.ndarray cluster_tree):
@@ -813,6 +813,8 @@ class HDBSCAN(BaseEstimator, ClusterMixin):
         self._raw_data = None
         self._outlier_scores = None
         self._prediction_data = None
+        self._condensed_tree_obj = None
+        self._min_spanning_tree_obj = None
 
     def fit(self, X, y=None):
         """Perform HDBSCAN clustering from features or distance matrix.
@@ -853,6 +855,10 @@ class HDBSCAN(BaseEstimator, ClusterMixin):
          self._single_linkage_tree,
          self._min_spanning_tree) = hdbscan(X, **kwargs)
 
+        # The tree objects cache derived data, so drop any from a previous fit
+        self._condensed_tree_obj = None
+        self._min_spanning_tree_obj = None
+
         if self.prediction_data:
             self.generate_prediction_data()
 
@@ -924,9 +930,16 @@ class HDBSCAN(BaseEstimator, ClusterMixin):
     @property
     def condensed_tree_(self):
         if self._condensed_tree is not None:
-            return CondensedTree(self._condensed_tree,
-                                 self.cluster_selection_method,
-                                 self.allow_single_cluster)
+            # Reuse the same object so its cached plot and selection data
+            # survive between accesses; models pickled by older versions
+            # do not have the attribute at all
+            if getattr(self, '_condensed_tree_obj', None) is None:
+                self._condensed_tree_obj = CondensedTree(self._condensed_tree)
+            self._condensed_tree_obj.cluster_selection_method = \
+                self.cluster_selection_method
+            self._condensed_tree_obj.allow_single_cluster = \
+                self.allow_single_cluster
+            return self._condensed_tree_obj
         else:
             raise AttributeError('No condensed tree was generated; try running fit first.')
 
@@ -942,8 +955,13 @@ class HDBSCAN(BaseEstimator, ClusterMixin):
     def minimum_spanning_tree_(self):
         if self._min_spanning_tree is not None:
             if self._raw_data is not None:
-                return MinimumSpanningTree(self._min_spanning_tree,
-                                           self._raw_data)
+                # Reuse the same object so its cached projection survives
+                # between accesses; models pickled by older versions do
+                # not have the attribute at all
+                if getattr(self, '_min_spanning_tree_obj', None) is None:
+                    self._min_spanning_tree_obj = MinimumSpanningTree(
+                        self._min_spanning_tree, self._raw_data)
+                return self._min_spanning_tree_obj
             else:
                 warn('No raw data is available; this may be due to using'
                      ' a precomputed metric matrix. No minimum spanning'
@@ -3,6 +3,8 @@
 #
 # License: BSD 3 clause
 
+import math
+
 import numpy as np
 
 from scipy.cluster.hierarchy import dendrogram
@@ -10,7 +12,11 @@ from sklearn.manifold import TSNE
 from sklearn.decomposition import PCA
 from sklearn.metrics import pairwise_distances
 from warnings import warn
-from ._hdbscan_tree import compute_stability, labelling_at_cut, recurse_leaf_dfs
+from ._hdbscan_tree import (compute_stability,
+                            labelling_at_cut,
+                            leaves_from_children_index,
+                            bfs_from_children_index,
+                            icicle_bar_ends)
 
 CB_LEFT = 0
 CB_RIGHT = 1
@@ -18,26 +24,45 @@ CB_BOTTOM = 2
 CB_TOP = 3
 
 
-def _bfs_from_cluster_tree(tree, bfs_root):
+def _group_by_parent(tree, max_node):
+    """
+    Group the rows of a tree in condensed tree format by parent.
+
+    Returns the row indices sorted (stably) by parent, together with an
+    offsets array such that the rows with parent ``n`` (for
+    ``n <= max_node``) are ``order[offsets[n]:offsets[n + 1]]``.
+    """
+    order = np.argsort(tree['parent'], kind='mergesort')
+    offsets = np.searchsorted(tree['parent'][order], np.arange(max_node + 2))
+    return order, offsets
+
+def _children_index(tree, max_node=None):
     """
-    Perform a breadth first search on a tree in condensed tree format
+    Group the children of a tree in condensed tree format by parent.
+
+    Returns the children sorted by parent, together with an offsets array
+    such that the children of node ``n`` (for ``n <= max_node``) are
+    ``sorted_children[offsets[n]:offsets[n + 1]]``.
     """
+    if max_node is None:
+        max_node = tree['child'].max()
 
-    result = []
-    to_process = [bfs_root]
+    order, offsets = _group_by_parent(tree, max_node)
+    return tree['child'][order], offsets
 
-    while to_process:
-        result.extend(to_process)
-        to_process = tree['child'][np.in1d(tree['parent'], to_process)].tolist()
+def _bfs_from_cluster_tree(tree, bfs_root, children_index=None):
+    """
+    Perform a breadth first search on a tree in condensed tree format.
 
-    return result
+    A precomputed ``children_index`` (as returned by ``_children_index``)
+    can be passed in to avoid regrouping the tree on every call.
+    """
+    if children_index is None:
+        children_index = _children_index(
+            tree, np.append(tree['child'], bfs_root).max())
+    sorted_children, offsets = children_index
 
-def _recurse_leaf_dfs(cluster_tree, current_node):
-    children = cluster_tree[cluster_tree['parent'] == current_node]['child']
-    if len(children) == 0:
-        return [current_node,]
-    else:
-        return sum([recurse_leaf_dfs(cluster_tree, child) for child in children], [])
+    return bfs_from_children_index(sorted_children, offsets, bfs_root).tolist()
 
 def _get_leaves(condensed_tree):
     cluster_tree = condensed_tree[condensed_tree['child_size'] > 1]
@@ -46,7 +71,8 @@ def _get_leaves(condensed_tree):
         return condensed_tree['parent'].min()
 
     root = cluster_tree['parent'].min()
-    return _recurse_leaf_dfs(cluster_tree, root)
+    sorted_children, offsets = _children_index(cluster_tree)
+    return leaves_from_children_index(sorted_children, offsets, root)
 
 class CondensedTree(object):
     """The condensed tree structure, which provides a simplified or smoothed version
@@ -71,6 +97,37 @@ class CondensedTree(object):
         self.cluster_selection_method = cluster_selection_method
         self.allow_single_cluster = allow_single_cluster
 
+        # Derived data is computed lazily and cached; the raw tree is
+        # treated as immutable once the CondensedTree has been created.
+        self._row_groups = None
+        self._cluster_tree = None
+        self._cluster_children = None
+        self._stability = None
+        self._selected_clusters = {}
+
+    def _get_row_groups(self):
+        """The rows of the condensed tree grouped by parent (see
+        ``_group_by_parent``), computed once and then reused."""
+        if self._row_groups is None:
+            self._row_groups = _group_by_parent(self._raw_tree,
+                                                self._raw_tree['parent'].max())
+        return self._row_groups
+
+    def _get_cluster_tree(self):
+        """The condensed tree restricted to clusters, along with its
+        children index; both are computed once and then reused."""
+        if self._cluster_tree is None:
+            self._cluster_tree = self._raw_tree[self._raw_tree['child_size'] > 1]
+            self._cluster_children = _children_index(
+                self._cluster_tree, self._raw_tree['parent'].max())
+        return self._cluster_tree, self._cluster_children
+
+    def _get_stability(self):
+        """The stability of each cluster in the tree, computed once."""
+        if self._stability is None:
+            self._stability = compute_stability(self._raw_tree)
+        return self._stability
+
     def get_plot_data(self,
                       leaf_separation=1,
                       log_size=False,
@@ -98,159 +155,204 @@ class CondensedTree(object):
         Returns
         -------
         plot_data : dict
-                    Data associated to bars in a bar plot:
+                    Data associated to bars in a bar plot, as float arrays
+                    of shape (n_bars,):
                         `bar_centers` x coordinate centers for bars
                         `bar_tops` heights of bars in lambda scale
                         `bar_bottoms` y coordinate of bottoms of bars
                         `bar_widths` widths of the bars (in x coord scale)
-                        `bar_bounds` a 4-tuple of [left, right, bottom, top]
-                                     giving the bounds on a full set of
-                                     cluster bars
-                    Data associates with cluster splits:
+                    Data associates with cluster splits, as float arrays of
+                    shape (n_splits, 2):
                         `line_xs` x coordinates for horizontal dendrogram lines
                         `line_ys` y coordinates for horizontal dendrogram lines
+                    Data associated with each cluster:
+                        `cluster_bounds` a dict mapping cluster ids to a list
+                                         of [left, right, bottom, top] giving
+                                         the bounds on a full set of
+                                         cluster bars
         """
         leaves = _get_leaves(self._raw_tree)
         last_leaf = self._raw_tree['parent'].max()
         root = self._raw_tree['parent'].min()
 
+        # Cluster ids are the contiguous range root..last_leaf, so per cluster
+        # data is stored in dense arrays indexed by (cluster id - root).
+        num_clusters = last_leaf - root + 1
+
+        # Sort the tree by parent; the children of the cluster with dense
+        # index i are then the rows starts[i]:starts[i + 1] of the sorted columns
+        order, starts = self._get_row_groups()
+        starts = starts[root:]
+        sorted_parents = self._raw_tree['parent'][order] - root
+        sorted_children = self._raw_tree['child'][order]
+        sorted_lambdas = self._raw_tree['lambda_val'][order]
+        sorted_sizes = self._raw_tree['child_size'][order]
+        sorted_is_cluster = sorted_sizes > 1
+
         # We want to get the x and y coordinates for the start of each cluster
         # Initialize the leaves, since we know where they go, the iterate
-        # through everything from the leaves back, setting coords as we go
+        # through everything from the leaves back, setting coords as we go.
+        cluster_x_coords = np.zeros(num_clusters)
+        cluster_y_coords = np.zeros(num_clusters)
         if isinstance(leaves, np.int64):
-            cluster_x_coords = {leaves: leaf_separation}
+            cluster_x_coords[leaves - root] = leaf_separation
         else:
-            cluster_x_coords = dict(zip(leaves, [leaf_separation * x
-                                                 for x in range(len(leaves))]))
-        cluster_y_coords = {root: 0.0}
-
-        for cluster in range(last_leaf, root - 1, -1):
-            split = self._raw_tree[['child', 'lambda_val']]
-            split = split[(self._raw_tree['parent'] == cluster) &
-                          (self._raw_tree['child_size'] > 1)]
-            if len(split['child']) > 1:
-                left_child, right_child = split['child']
-                cluster_x_coords[cluster] = np.mean([cluster_x_coords[left_child],
-                                                     cluster_x_coords[right_child]])
-                cluster_y_coords[left_child] = split['lambda_val'][0]
-                cluster_y_coords[right_child] = split['lambda_val'][1]
+            cluster_x_coords[np.asarray(leaves) - root] = \
+                leaf_separation * np.arange(len(leaves))
+        cluster_y_coords[0] = 0.0
+
+        for i in range(num_clusters - 1, -1, -1):
+            c_rows = slice(starts[i], starts[i + 1])
+            split_mask = sorted_is_cluster[c_rows]
+            split_children = sorted_children[c_rows][split_mask] - root
+            split_lambdas = sorted_lambdas[c_rows][split_mask]
+            if len(split_children) > 1:
+                cluster_x_coords[i] = np.mean(cluster_x_coords[split_children])
+                cluster_y_coords[split_children] = split_lambdas
 
         # We use bars to plot the 'icicles', so we need to generate centers, tops,
         # bottoms and widths for each rectangle. We can go through each cluster
-        # and do this for each in turn.
-        bar_centers = []
-        bar_tops = []
-        bar_bottoms = []
-        bar_widths = []
-
-        cluster_bounds = {}
-
-        scaling = np.sum(self._raw_tree[self._raw_tree['parent'] == root]['child_size'])
+        # and do this for each in turn. Every bar ends at a distinct row of the
+        # tree, so the number of rows bounds the number of bars.
+        num_rows = self._raw_tree.shape[0]
+        bar_centers = np.empty(num_rows)
+        bar_tops = np.empty(num_rows)
+        bar_bottoms = np.empty(num_rows)
+        bar_widths = np.empty(num_rows)
+        num_bars = 0
+
+        cluster_bounds = np.zeros((num_clusters, 4))
+
+        # Per cluster aggregates of the children, each computed in a single
+        # pass over the sorted tree
+        cluster_sizes = np.bincount(sorted_parents, weights=sorted_sizes,
+                                    minlength=num_clusters)
+        cluster_max_lambdas = np.maximum.reduceat(sorted_lambdas,
+                                                  starts[:num_clusters])
+        at_max_lambda = sorted_lambdas == cluster_max_lambdas[sorted_parents]
+        cluster_min_sizes = np.bincount(sorted_parents,
+                                        weights=sorted_sizes * at_max_lambda,
+                                        minlength=num_clusters)
+
+        scaling = cluster_sizes[0]
 
         if log_size:
-            scaling = np.log(scaling)
-
-        for c in range(last_leaf, root - 1, -1):
+            scaling = math.log(scaling)
+
+        for i in range(num_clusters - 1, -1, -1):
+
+            c_rows = slice(starts[i], starts[i + 1])
+            c_children_lambda = sorted_lambdas[c_rows]
+            c_children_size = sorted_sizes[c_rows]
+            current_lambda = cluster_y_coords[i]
+            cluster_max_lambda = cluster_max_lambdas[i]
+            cluster_min_size = cluster_min_sizes[i]
+
+            # Order the children by the lambda value at which they leave the
+            # cluster; sizes[j] is the size of the cluster (and prev_lambdas[j]
+            # its lambda value) just before the j-th child leaves. Sizes are
+            # accumulated linearly and only then converted to log scale.
+            lambda_order = np.argsort(c_children_lambda)
+            lambdas = c_children_lambda[lambda_order]
+            prev_lambdas = np.concatenate(([current_lambda], lambdas[:-1]))
+            sizes = cluster_sizes[i] - np.concatenate(
+                ([0], np.cumsum(c_children_size[lambda_order])[:-1]))
+            if log_size:
+                # Ensure we don't try to take log of zero
+                sizes = np.log(np.maximum(sizes, 1))
+                cluster_min_size = math.log(cluster_min_size)
 
-            cluster_bounds[c] = [0, 0, 0, 0]
+            current_size = sizes[0]
+            total_size_change = float(current_size - cluster_min_size)
+            step_size_change = total_size_change / max_rectangle_per_icicle
 
-            c_children = self._raw_tree[self._raw_tree['parent'] == c]
-            current_size = np.sum(c_children['child_size'])
-            current_lambda = cluster_y_coords[c]
-            cluster_max_size = current_size
-            cluster_max_lambda = c_children['lambda_val'].max()
-            cluster_min_size = np.sum(
-                c_children[c_children['lambda_val'] ==
-                           cluster_max_lambda]['child_size'])
+            cluster_bounds[i][CB_LEFT] = cluster_x_coords[i] * scaling - (current_size / 2.0)
+            cluster_bounds[i][CB_RIGHT] = cluster_x_coords[i] * scaling + (current_size / 2.0)
+            cluster_bounds[i][CB_BOTTOM] = cluster_y_coords[i]
+            cluster_bounds[i][CB_TOP] = cluster_max_lambda
 
-            if log_size:
-                current_size = np.log(current_size)
-                cluster_max_size = np.log(cluster_max_size)
-                cluster_min_size = np.log(cluster_min_size)
+            bar_ends = icicle_bar_ends(lambdas, prev_lambdas, sizes,
+                                       current_size, step_size_change,
+                                       cluster_max_lambda)
 
-            total_size_change = float(cluster_max_size - cluster_min_size)
-            step_size_change = total_size_change / max_rectangle_per_icicle
+            # Each bar starts where the previous one ended
+            n_bars = len(bar_ends)
+            c_bars = slice(num_bars, num_bars + n_bars)
+            num_bars += n_bars
 
-            cluster_bounds[c][CB_LEFT] = cluster_x_coords[c] * scaling - (current_size / 2.0)
-            cluster_bounds[c][CB_RIGHT] = cluster_x_coords[c] * scaling + (current_size / 2.0)
-            cluster_bounds[c][CB_BOTTOM] = cluster_y_coords[c]
-            cluster_bounds[c][CB_TOP] = np.max(c_children['lambda_val'])
-
-            last_step_size = current_size
-            last_step_lambda = current_lambda
-
-            for i in np.argsort(c_children['lambda_val']):
-                row = c_children[i]
-                if row['lambda_val'] != current_lambda and \
-                        (last_step_size - current_size > step_size_change
-                        or row['lambda_val'] == cluster_max_lambda):
-                    bar_centers.append(cluster_x_coords[c] * scaling)
-                    bar_tops.append(row['lambda_val'] - last_step_lambda)
-                    bar_bottoms.append(last_step_lambda)
-                    bar_widths.append(last_step_size)
-                    last_step_size = current_size
-                    last_step_lambda = current_lambda
-                if log_size:
-                    exp_size = np.exp(current_size) - row['child_size']
-                    # Ensure we don't try to take log of zero
-                    if exp_size > 0.01:
-                        current_size = np.log(np.exp(current_size) - row['child_size'])
-                    else:
-                        current_size = 0.0
-                else:
-                    current_size -= row['child_size']
-                current_lambda = row['lambda_val']
+            bar_centers[c_bars] = cluster_x_coords[i] * scaling
+            bar_bottoms[c_bars] = np.concatenate(([current_lambda],
+                                                  prev_lambdas[bar_ends]))[:n_bars]
+            bar_tops[c_bars] = lambdas[bar_ends] - bar_bottoms[c_bars]
+            bar_widths[c_bars] = np.concatenate(([current_size],
+                                                 sizes[bar_ends]))[:n_bars]
 
         # Finally we need the horizontal lines that occur at cluster splits.
-        line_xs = []
-        line_ys = []
-
-        for row in self._raw_tree[self._raw_tree['child_size'] > 1]:
-            parent = row['parent']
-            child = row['child']
-            child_size = row['child_size']
-            if log_size:
-                child_size = np.log(child_size)
-            sign = np.sign(cluster_x_coords[child] - cluster_x_coords[parent])
-            line_xs.append([
-                cluster_x_coords[parent] * scaling,
-                cluster_x_coords[child] * scaling + sign * (child_size / 2.0)
-            ])
-            line_ys.append([
-                cluster_y_coords[child],
-                cluster_y_coords[child]
-            ])
+        cluster_tree, _ = self._get_cluster_tree()
+        parents = cluster_tree['parent'] - root
+        children = cluster_tree['child'] - root
+        child_sizes = cluster_tree['child_size']
+        if log_size:
+            child_sizes = np.log(child_sizes)
+
+        sign = np.sign(cluster_x_coords[children] - cluster_x_coords[parents])
+        line_xs = np.column_stack([
+            cluster_x_coords[parents] * scaling,
+            cluster_x_coords[children] * scaling + sign * (child_sizes / 2.0)
+        ])
+        line_ys = np.column_stack([
+            cluster_y_coords[children],
+            cluster_y_coords[children]
+        ])
 
         return {
-            'bar_centers': bar_centers,
-            'bar_tops': bar_tops,
-            'bar_bottoms': bar_bottoms,
-            'bar_widths': bar_widths,
+            'bar_centers': bar_centers[:num_bars],
+            'bar_tops': bar_tops[:num_bars],
+            'bar_bottoms': bar_bottoms[:num_bars],
+            'bar_widths': bar_widths[:num_bars],
             'line_xs': line_xs,
             'line_ys': line_ys,
-            'cluster_bounds': cluster_bounds
+            'cluster_bounds': dict(zip(range(root, last_leaf + 1),
+                                       cluster_bounds.tolist()))
         }
 
     def _select_clusters(self):
+        # Cache per selection setting, since both are public attributes
+        # that may be changed after the tree has been created.
+        key = (self.cluster_selection_method, self.allow_single_cluster)
+        if key not in self._selected_clusters:
+            self._selected_clusters[key] = self._compute_selected_clusters()
+        selected_clusters = self._selected_clusters[key]
+        # Hand out a copy so callers cannot modify the cached selection
+        if isinstance(selected_clusters, list):
+            return list(selected_clusters)
+        return selected_clusters
+
+    def _compute_selected_clusters(self):
         if self.cluster_selection_method == 'eom':
-            stability = compute_stability(self._raw_tree)
+            # Copy the cached stability, since it is updated in place below
+            stability = dict(self._get_stability())
             if self.allow_single_cluster:
                 node_list = sorted(stability.keys(), reverse=True)
             else:
                 node_list = sorted(stability.keys(), reverse=True)[:-1]
-            cluster_tree = self._raw_tree[self._raw_tree['child_size'] > 1]
+            cluster_tree, cluster_children = self._get_cluster_tree()
+            sorted_children, offsets = cluster_children
             is_cluster = {cluster: True for cluster in node_list}
 
             for node in node_list:
-                child_selection = (cluster_tree['parent'] == node)
+                # stability is keyed by float node ids
+                node_id = int(node)
+                children = sorted_children[offsets[node_id]:offsets[node_id + 1]]
                 subtree_stability = np.sum([stability[child] for
-                                            child in cluster_tree['child'][child_selection]])
+                                            child in children])
 
                 if subtree_stability > stability[node]:
                     is_cluster[node] = False
                     stability[node] = subtree_stability
                 else:
-                    for sub_node in _bfs_from_cluster_tree(cluster_tree, node):
+                    for sub_node in _bfs_from_cluster_tree(cluster_tree, node_id,
+                                                           cluster_children):
                         if sub_node != node:
                             is_cluster[sub_node] = False
 
@@ -340,9 +442,9 @@ class CondensedTree(object):
 
         if cmap != 'none':
             sm = plt.cm.ScalarMappable(cmap=cmap,
-                                       norm=plt.Normalize(0, max(plot_data['bar_widths'])))
+                                       norm=plt.Normalize(0, plot_data['bar_widths'].max()))
             sm.set_array(plot_data['bar_widths'])
-            bar_colors = [sm.to_rgba(x) for x in plot_data['bar_widths']]
+            bar_colors = sm.to_rgba(plot_data['bar_widths'])
         else:
             bar_colors = 'black'
 
@@ -359,13 +461,9 @@ class CondensedTree(object):
             linewidth=0
         )
 
-        drawlines = []
-        for xs, ys in zip(plot_data['line_xs'], plot_data['line_ys']):
-            drawlines.append(xs)
-            drawlines.append(ys)
-        axis.plot(*drawlines, color='black', linewidth=1)
-        # for xs, ys in zip(plot_data['line_xs'], plot_data['line_ys']):
-        #     axis.plot(xs, ys, color='black', linewidth=1)
+        # Each column of the transposed arrays is one line
+        axis.plot(plot_data['line_xs'].T, plot_data['line_ys'].T,
+                  color='black', linewidth=1)
 
         if select_clusters:
             try:
@@ -422,10 +520,19 @@ class CondensedTree(object):
 
         return axis
 
-    def to_numpy(self):
+    def to_numpy(self, copy=True):
         """Return a numpy structured array representation of the condensed tree.
+
+        Parameters
+        ----------
+        copy : boolean, optional (default True)
+            Whether to return a copy of the tree. If False the
+            array shared with this object is returned, which avoids a copy
+            of a potentially large array but must not be modified.
         """
-        return self._raw_tree.copy()
+        if copy:
+            return self._raw_tree.copy()
+        return self._raw_tree
 
     def to_pandas(self):
         """Return a pandas dataframe representation of the condensed tree.
@@ -469,22 +576,21 @@ class CondensedTree(object):
         except ImportError:
             raise ImportError('You must have networkx installed to export networkx graphs')
 
+        children = self._raw_tree['child'].tolist()
+
         result = DiGraph()
-        for row in self._raw_tree:
-            result.add_edge(row['parent'], row['child'], weight=row['lambda_val'])
+        result.add_weighted_edges_from(zip(self._raw_tree['parent'].tolist(),
+                                           children,
+                                           self._raw_tree['lambda_val'].tolist()))
 
-        set_node_attributes(result, dict(self._raw_tree[['child', 'child_size']]), 'size')
+        # Pass attributes by keyword; the positional order of name and
+        # values differs between NetworkX 1.x and 2.x
+        size_dict = dict(zip(children, self._raw_tree['child_size'].tolist()))
+        set_node_attributes(result, name='size', values=size_dict)
 
         return result
 
 
-def _line_width(y, linkage):
-    if y == 0.0:
-        return 1.0
-    else:
-        return linkage[linkage.T[2] == y][0, 3]
-
-
 class SingleLinkageTree(object):
     """A single linkage format dendrogram tree, with plotting functionality
     and networkX support.
@@ -552,6 +658,7 @@ class SingleLinkageTree(object):
 
         try:
             import matplotlib.pyplot as plt
+            from matplotlib.collections import LineCollection
         except ImportError:
             raise ImportError('You must install the matplotlib library to plot the single linkage tree.')
 
@@ -559,8 +666,13 @@ class SingleLinkageTree(object):
             axis = plt.gca()
 
         if vary_line_width:
-            linewidths = [(_line_width(y[0], self._linkage),
-                           _line_width(y[1], self._linkage))
+            # Look up the size of the cluster formed at each merge distance;
+            # build the map in reverse so the first merge at a distance wins.
+            # Branches that reach down to zero are drawn at unit width.
+            size_at_distance = dict(zip(self._linkage[::-1, 2].tolist(),
+                                        self._linkage[::-1, 3].tolist()))
+            size_at_distance[0.0] = 1.0
+            linewidths = [(size_at_distance[y[0]], size_at_distance[y[1]])
                           for y in Y]
         else:
             linewidths = [(1.0, 1.0)] * len(Y)
@@ -571,31 +683,40 @@ class SingleLinkageTree(object):
                                        norm=plt.Normalize(0, color_array.max()))
             sm.set_array(color_array)
 
-        for x, y, lw in zip(X, Y, linewidths):
-            left_x = x[:2]
-            right_x = x[2:]
-            left_y = y[:2]
-            right_y = y[2:]
-            horizontal_x = x[1:3]
-            horizontal_y = y[1:3]
-
-            if cmap != 'none':
-                axis.plot(left_x, left_y, color=sm.to_rgba(np.log2(lw[0])),
-                          linewidth=np.log2(1 + lw[0]),
-                          solid_joinstyle='miter', solid_capstyle='butt')
-                axis.plot(right_x, right_y, color=sm.to_rgba(np.log2(lw[1])),
-                          linewidth=np.log2(1 + lw[1]),
-                          solid_joinstyle='miter', solid_capstyle='butt')
-            else:
-                axis.plot(left_x, left_y, color='k',
-                          linewidth=np.log2(1 + lw[0]),
-                          solid_joinstyle='miter', solid_capstyle='butt')
-                axis.plot(right_x, right_y, color='k',
-                          linewidth=np.log2(1 + lw[1]),
-                          solid_joinstyle='miter', solid_capstyle='butt')
+        # Each link in the dendrogram is a left and a right downward branch
+        # joined by a horizontal line; rather than creating an artist per
+        # line, draw them all as one collection, link by link, so that
+        # overlapping lines are drawn in the same order as separate artists.
+        X = np.asarray(X)
+        Y = np.asarray(Y)
+        linewidths = np.asarray(linewidths, dtype=np.double)
+
+        left_segments = np.dstack([X[:, :2], Y[:, :2]])
+        right_segments = np.dstack([X[:, 2:], Y[:, 2:]])
+        horizontal_segments = np.dstack([X[:, 1:3], Y[:, 1:3]])
+        segments = np.concatenate([left_segments[:, None],
+                                   right_segments[:, None],
+                                   horizontal_segments[:, None]],
+                                  axis=1).reshape(-1, 2, 2)
+
+        segment_widths = np.column_stack([
+            np.log2(1 + linewidths),
+            np.ones(len(linewidths))
+        ]).ravel()
 
-            axis.plot(horizontal_x, horizontal_y, color='k', linewidth=1.0,
-                      solid_joinstyle='miter', solid_capstyle='butt')
+        if cmap != 'none':
+            segment_colors = np.empty((len(linewidths), 3, 4))
+            segment_colors[:, :2] = sm.to_rgba(np.log2(linewidths))
+            segment_colors[:, 2] = (0.0, 0.0, 0.0, 1.0)
+            segment_colors = segment_colors.reshape(-1, 4)
+        else:
+            segment_colors = 'k'
+
+        axis.add_collection(LineCollection(segments,
+                                           linewidths=segment_widths,
+                                           colors=segment_colors,
+                                           joinstyle='miter', capstyle='butt'))
+        axis.autoscale_view()
 
         if colorbar:
             cb = plt.colorbar(sm)
@@ -608,15 +729,24 @@ class SingleLinkageTree(object):
 
         return axis
 
-    def to_numpy(self):
+    def to_numpy(self, copy=True):
         """Return a numpy array representation of the single linkage tree.
 
         This representation conforms to the scipy.cluster.hierarchy notion
         of a single linkage tree, and can be used with all the associated
         scipy tools. Please see the scipy documentation for more details
         on the format.
+
+        Parameters
+        ----------
+        copy : boolean, optional (default True)
+            Whether to return a copy of the tree. If False the
+            array shared with this object is returned, which avoids a copy
+            of a potentially large array but must not be modified.
         """
-        return self._linkage.copy()
+        if copy:
+            return self._linkage.copy()
+        return self._linkage
 
 
     def to_pandas(self):
@@ -673,13 +803,15 @@ class SingleLinkageTree(object):
         max_node = 2 * self._linkage.shape[0]
         num_points = max_node - (self._linkage.shape[0] - 1)
 
+        parents = range(num_points, max_node + 1)
+        distances = self._linkage.T[2].tolist()
+
         result = DiGraph()
-        for parent, row in enumerate(self._linkage, num_points):
-            result.add_edge(parent, row[0], weight=row[2])
-            result.add_edge(parent, row[1], weight=row[2])
+        result.add_weighted_edges_from(zip(parents, self._linkage.T[0].tolist(), distances))
+        result.add_weighted_edges_from(zip(parents, self._linkage.T[1].tolist(), distances))
 
-        size_dict = {parent: row[3] for parent, row in enumerate(self._linkage, num_points)}
-        set_node_attributes(result, size_dict, 'size')
+        size_dict = dict(zip(parents, self._linkage.T[3].tolist()))
+        set_node_attributes(result, name='size', values=size_dict)
 
         return result
 
@@ -714,10 +846,29 @@ class MinimumSpanningTree(object):
     def __init__(self, mst, data):
         self._mst = mst
         self._data = data
+        self._projection = None
+
+    def _get_projection(self):
+        """A 2D projection of the data (via t-SNE if required); this is
+        expensive, so it is computed once and then reused."""
+        if self._projection is None:
+            if self._data.shape[1] > 2:
+                # Get a 2D projection; if we have a lot of dimensions use PCA first
+                if self._data.shape[1] > 32:
+                    # Use PCA to get down to 32 dimension
+                    data_for_projection = PCA(n_components=32).fit_transform(self._data)
+                else:
+                    data_for_projection = self._data
+
+                self._projection = TSNE().fit_transform(data_for_projection)
+            else:
+                self._projection = self._data
+        return self._projection
 
     def plot(self, axis=None, node_size=40, node_color='k',
              node_alpha=0.8, edge_alpha=0.5, edge_cmap='viridis_r',
-             edge_linewidth=2, vary_line_width=True, colorbar=True):
+             edge_linewidth=2, vary_line_width=True, colorbar=True,
+             projection=None):
         """Plot the minimum spanning tree (as projected into 2D by t-SNE if required).
 
         Parameters
@@ -755,6 +906,12 @@ class MinimumSpanningTree(object):
         colorbar : bool, optional
                 Whether to draw a colorbar. (default True)
 
+        projection : array (n_samples, 2), optional
+                A 2D embedding of the data to render the tree in. If None
+                then the data itself is used if it is 2D, otherwise a t-SNE
+                projection is computed, which is cached for subsequent
+                plots. (default None)
+
         Returns
         -------
 
@@ -774,17 +931,8 @@ class MinimumSpanningTree(object):
         if axis is None:
             axis = plt.gca()
 
-        if self._data.shape[1] > 2:
-            # Get a 2D projection; if we have a lot of dimensions use PCA first
-            if self._data.shape[1] > 32:
-                # Use PCA to get down to 32 dimension
-                data_for_projection = PCA(n_components=32).fit_transform(self._data)
-            else:
-                data_for_projection = self._data.copy()
-
-            projection = TSNE().fit_transform(data_for_projection)
-        else:
-            projection = self._data.copy()
+        if projection is None:
+            projection = self._get_projection()
 
         if vary_line_width:
             line_width = edge_linewidth * (np.log(self._mst.T[2].max() / self._mst.T[2]) + 1.0)
@@ -807,10 +955,19 @@ class MinimumSpanningTree(object):
 
         return axis
 
-    def to_numpy(self):
+    def to_numpy(self, copy=True):
         """Return a numpy array of weighted edges in the minimum spanning tree
+
+        Parameters
+        ----------
+        copy : boolean, optional (default True)
+            Whether to return a copy of the edges. If False the
+            array shared with this object is returned, which avoids a copy
+            of a potentially large array but must not be modified.
         """
-        return self._mst.copy()
+        if copy:
+            return self._mst.copy()
+        return self._mst
 
     def to_pandas(self):
         """Return a Pandas dataframe of the minimum spanning tree.
@@ -825,9 +982,10 @@ class MinimumSpanningTree(object):
         except ImportError:
             raise ImportError('You must have pandas installed to export pandas DataFrames')
 
-        result = DataFrame({'from': self._mst.T[0].astype(int),
-                            'to': self._mst.T[1].astype(int),
-                            'distance': self._mst.T[2]})
+        edges = self._mst[:, :2].astype(int)
+        result = DataFrame({'from': edges[:, 0],
+                            'to': edges[:, 1],
+                            'distance': self._mst[:, 2]})
         return result
 
     def to_networkx(self):
@@ -844,10 +1002,9 @@ class MinimumSpanningTree(object):
             raise ImportError('You must have networkx installed to export networkx graphs')
 
         result = Graph()
-        for row in self._mst:
-            result.add_edge(row[0], row[1], weight=row[2])
+        result.add_weighted_edges_from(self._mst.tolist())
 
-        data_dict = {index: tuple(row) for index, row in enumerate(self._data)}
-        set_node_attributes(result, data_dict, 'data')
+        data_dict = dict(enumerate(map(tuple, self._data.tolist())))
+        set_node_attributes(result, name='data', values=data_dict)
 
         return result
@@ -7,7 +7,9 @@ import numpy as np
 
 from sklearn.neighbors import KDTree, BallTree
 from .dist_metrics import DistanceMetric
-from ._hdbscan_tree import compute_stability, labelling_at_cut, recurse_leaf_dfs
+from ._hdbscan_tree import (compute_stability,
+                            labelling_at_cut,
+                            leaves_from_children_index)
 from ._prediction_utils import (get_tree_row_with_child,
                                 dist_membership_vector,
                                 outlier_membership_vector,
@@ -88,13 +90,9 @@ class PredictionData(object):
         return result
 
     def _recurse_leaf_dfs(self, current_node):
-        children = self.cluster_tree[self.cluster_tree['parent'] ==
-                                     current_node]['child']
-        if len(children) == 0:
-            return [current_node, ]
-        else:
-            return sum(
-                [recurse_leaf_dfs(self.cluster_tree, child) for child in children], [])
+        sorted_children, offsets = self._cluster_children
+        return leaves_from_children_index(sorted_children, offsets,
+                                          current_node)
 
     def __init__(self, data, condensed_tree, min_samples,
                  tree_type='kdtree', metric='euclidean', **kwargs):
@@ -111,8 +109,10 @@ class PredictionData(object):
         self.cluster_map = {c: n for n, c in enumerate(sorted(list(selected_clusters)))}
         self.reverse_cluster_map = {n: c for c, n in self.cluster_map.items()}
 
-        self.cluster_tree = raw_condensed_tree[raw_condensed_tree['child_size']
-                                               > 1]
+        # The cluster tree and its children index are cached on the
+        # condensed tree, so the leaf searches below share one index
+        self.cluster_tree, self._cluster_children = \
+            condensed_tree._get_cluster_tree()
         self.max_lambdas = {}
         self.leaf_max_lambdas = {}
         self.exemplars = []
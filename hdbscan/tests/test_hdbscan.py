@@ -24,6 +24,11 @@ from hdbscan import (HDBSCAN,
                      approximate_predict,
                      membership_vector,
                      all_points_membership_vectors)
+from hdbscan.plots import _children_index, _bfs_from_cluster_tree
+from hdbscan._hdbscan_tree import (leaves_from_children_index,
+                                   bfs_from_children_index,
+                                   icicle_bar_ends,
+                                   recurse_leaf_dfs)
 # from sklearn.cluster.tests.common import generate_clustered_data
 from sklearn.datasets import make_blobs
 from sklearn.utils import shuffle
@@ -353,6 +358,33 @@ def test_condensed_tree_plot():
                                                   cmap='none')
 
 
+def test_condensed_tree_reused():
+    clusterer = HDBSCAN().fit(X)
+    tree = clusterer.condensed_tree_
+    assert tree is clusterer.condensed_tree_
+
+    clusterer.condensed_tree_.get_plot_data()
+    row_groups = tree._get_row_groups()
+    clusterer.condensed_tree_.get_plot_data()
+    assert clusterer.condensed_tree_._get_row_groups() is row_groups
+
+    selected = tree._select_clusters()
+    selected.append(-1)
+    assert_not_in(-1, clusterer.condensed_tree_._select_clusters())
+
+    clusterer.set_params(cluster_selection_method='leaf')
+    assert_equal(clusterer.condensed_tree_.cluster_selection_method, 'leaf')
+
+    clusterer.fit(X)
+    assert tree is not clusterer.condensed_tree_
+
+    # Models pickled before the tree was kept on the estimator
+    del clusterer._condensed_tree_obj
+    assert_array_equal(clusterer.condensed_tree_.to_numpy(),
+                       tree.to_numpy())
+    clusterer.generate_prediction_data()
+
+
 def test_single_linkage_tree_plot():
     clusterer = HDBSCAN(gen_min_span_tree=True).fit(X)
     if_matplotlib(clusterer.single_linkage_tree_.plot)(cmap='Reds')
@@ -382,6 +414,19 @@ def test_min_span_tree_plot():
                                                          vary_line_width=False,
                                                          colorbar=False)
 
+    tree = clusterer.minimum_spanning_tree_
+    if_matplotlib(tree.plot)(projection=H[:, :2], colorbar=False)
+
+    # The t-SNE projection is computed once and reused on later plots
+    tree = clusterer.minimum_spanning_tree_
+    assert tree is clusterer.minimum_spanning_tree_
+    assert tree._get_projection() is tree._get_projection()
+
+    # Models pickled before the tree was kept on the estimator
+    del clusterer._min_spanning_tree_obj
+    assert_array_equal(clusterer.minimum_spanning_tree_.to_numpy(),
+                       tree.to_numpy())
+
 
 def test_tree_numpy_output_formats():
 
@@ -391,6 +436,12 @@ def test_tree_numpy_output_formats():
     clusterer.condensed_tree_.to_numpy()
     clusterer.minimum_spanning_tree_.to_numpy()
 
+    for tree in (clusterer.single_linkage_tree_,
+                 clusterer.condensed_tree_,
+                 clusterer.minimum_spanning_tree_):
+        assert_array_equal(tree.to_numpy(copy=False), tree.to_numpy())
+        assert tree.to_numpy(copy=False) is tree.to_numpy(copy=False)
+
 
 def test_tree_pandas_output_formats():
 
@@ -408,6 +459,92 @@ def test_tree_networkx_output_formats():
     if_networkx(clusterer.minimum_spanning_tree_.to_networkx)()
 
 
+def test_tree_traversal_kernels():
+    # A hand built cluster tree: 10 -> (11, 12), 11 -> (13, 14), 12 -> (15, 16)
+    cluster_tree = np.array([(10, 11, 0.1, 6), (10, 12, 0.1, 4),
+                             (11, 13, 0.3, 3), (11, 14, 0.3, 3),
+                             (12, 15, 0.2, 2), (12, 16, 0.2, 2)],
+                            dtype=[('parent', np.intp), ('child', np.intp),
+                                   ('lambda_val', float),
+                                   ('child_size', np.intp)])
+    # Shuffle the rows; siblings should be visited in row order
+    cluster_tree = cluster_tree[[3, 5, 0, 4, 1, 2]]
+
+    def children_of(node):
+        return cluster_tree['child'][cluster_tree['parent'] == node].tolist()
+
+    def python_leaves(node):
+        children = children_of(node)
+        if len(children) == 0:
+            return [node]
+        return sum([python_leaves(child) for child in children], [])
+
+    def python_bfs(node):
+        result = []
+        to_process = [node]
+        while to_process:
+            result.extend(to_process)
+            to_process = sum([children_of(n) for n in to_process], [])
+        return result
+
+    sorted_children, offsets = _children_index(cluster_tree)
+    for node in range(10, 17):
+        assert_equal(leaves_from_children_index(sorted_children, offsets,
+                                                node),
+                     python_leaves(node))
+        assert_equal(bfs_from_children_index(sorted_children, offsets,
+                                             node).tolist(),
+                     python_bfs(node))
+    assert_equal(_bfs_from_cluster_tree(cluster_tree, 10),
+                 [10, 11, 12, 14, 13, 16, 15])
+    assert_equal(recurse_leaf_dfs(cluster_tree, 10), [14, 13, 16, 15])
+
+    assert_raises(ValueError, leaves_from_children_index,
+                  sorted_children, offsets, offsets.shape[0] - 1)
+    assert_raises(ValueError, bfs_from_children_index,
+                  sorted_children, offsets, -1)
+
+    # Offsets that run past the children and back again
+    bad_offsets = offsets.copy()
+    bad_offsets[11] = 1000000
+    assert_raises(ValueError, leaves_from_children_index,
+                  sorted_children, bad_offsets, 10)
+    assert_raises(ValueError, bfs_from_children_index,
+                  sorted_children, bad_offsets, 10)
+
+    # Node 11 is its own grandchild, so this is not a tree
+    cyclic_children = sorted_children.copy()
+    cyclic_children[cyclic_children == 13] = 11
+    assert_raises(ValueError, leaves_from_children_index,
+                  cyclic_children, offsets, 10)
+    assert_raises(ValueError, bfs_from_children_index,
+                  cyclic_children, offsets, 10)
+
+
+def test_icicle_bar_ends():
+    lambdas = np.array([0.1, 0.1, 0.2, 0.3, 0.4])
+    prev_lambdas = np.array([0.0, 0.1, 0.1, 0.2, 0.3])
+    sizes = np.array([10.0, 9.0, 5.0, 4.0, 2.0])
+
+    def python_bar_ends(last_step_size, step_size_change, max_lambda):
+        result = []
+        for i in range(len(lambdas)):
+            if lambdas[i] != prev_lambdas[i] and \
+                    (last_step_size - sizes[i] > step_size_change or
+                     lambdas[i] == max_lambda):
+                result.append(i)
+                last_step_size = sizes[i]
+        return result
+
+    for step_size_change in (0.0, 1.5, 4.0, 20.0):
+        assert_equal(icicle_bar_ends(lambdas, prev_lambdas, sizes, 10.0,
+                                     step_size_change, 0.4).tolist(),
+                     python_bar_ends(10.0, step_size_change, 0.4))
+
+    assert_raises(ValueError, icicle_bar_ends, lambdas, prev_lambdas[:-1],
+                  sizes, 10.0, 1.0, 0.4)
+
+
 def test_hdbscan_outliers():
     clusterer = HDBSCAN(gen_min_span_tree=True).fit(X)
     scores = clusterer.outlier_scores_